@@ -5,38 +5,41 @@ sys.path.insert(0,os.path.dirname(currentdir))
 
 import cv2
 from cv_bridge import CvBridge
+from functools import partial
+import multiprocessing
+import numpy as np
 import pickle
 import rosbag
+import struct
 import Helpers.pbal_msg_helper as pmh
-
-def parse_wrench_stamped(msg):
-    return [
-        msg.wrench.force.x, 
-        msg.wrench.force.y, 
-        msg.wrench.force.z, 
-        msg.wrench.torque.x, 
-        msg.wrench.torque.y, 
-        msg.wrench.torque.z]
-
-def parse_pose_stamped(msg):
-    return [
-        msg.pose.position.x, 
-        msg.pose.position.y, 
-        msg.pose.position.z, 
-        msg.pose.orientation.x, 
-        msg.pose.orientation.y, 
-        msg.pose.orientation.z,
-        msg.pose.orientation.w]
-
-def parse_transform_stamped(msg):
-    return [
-        msg.transform.translation.x, 
-        msg.transform.translation.y, 
-        msg.transform.translation.z, 
-        msg.transform.rotation.x, 
-        msg.transform.rotation.y, 
-        msg.transform.rotation.z,
-        msg.transform.rotation.w]
+from Helpers.converted_bag_helper import converted_bag_format
+
+# the stamped geometry messages are serialized as a std_msgs/Header followed by a
+# fixed block of little-endian doubles, so they are unpacked straight from the raw buffer
+def header_length(buff):
+    # uint32 seq, uint32 secs, uint32 nsecs, then a uint32 length prefixed frame_id
+    return 16 + struct.unpack_from('<I', buff, 12)[0]
+
+def parse_wrench_stamped(buff):
+    # force.xyz, torque.xyz
+    return struct.unpack_from('<6d', buff, header_length(buff))
+
+def parse_pose_stamped(buff):
+    # position.xyz, orientation.xyzw
+    return struct.unpack_from('<7d', buff, header_length(buff))
+
+def parse_transform_stamped(buff):
+    # skip the child_frame_id string, then translation.xyz, rotation.xyzw
+    offset = header_length(buff)
+    offset += 4 + struct.unpack_from('<I', buff, offset)[0]
+    return struct.unpack_from('<7d', buff, offset)
+
+# message type -> (parser, number of doubles per message)
+fixed_layout_parsers = {
+    'geometry_msgs/WrenchStamped': (parse_wrench_stamped, 6),
+    'geometry_msgs/PoseStamped': (parse_pose_stamped, 7),
+    'geometry_msgs/TransformStamped': (parse_transform_stamped, 7),
+}
 
 def parse_custom_pbal_message(msg):
 
@@ -56,88 +59,170 @@ def parse_custom_pbal_message(msg):
 
     return msg
 
+def image_to_bgr8(msg, bridge):
+    # 8 bit color images are viewed straight out of the message buffer,
+    # any other encoding goes through cv_bridge
+    if msg.encoding == 'bgr8' or msg.encoding == 'rgb8':
+        # rows can be padded past width*3 bytes, so slice each row down to step before reshaping
+        cv_image = np.frombuffer(msg.data, dtype=np.uint8).reshape(msg.height, msg.step)[:, :3*msg.width]
+        cv_image = cv_image.reshape(msg.height, msg.width, 3)
+
+        if msg.encoding == 'rgb8':
+            cv_image = np.ascontiguousarray(cv_image[:, :, ::-1])
+
+        return cv_image
+
+    return bridge.imgmsg_to_cv2(msg, desired_encoding='bgr8')
+
+def parse_float32_multi_array(msg):
+    return msg.data
+
 def parse_apriltag_detection_Int32(msg):
-    msg = msg.data
+    return msg.data
 
 def parse_apriltag_detection_Bool(msg):
-    msg = msg.data
+    return msg.data
     
 def parse_apriltag_detection_array(msg_in):
 
-    if len(msg_in.detections)>0:
-        detection_dict = {}
-        for i in range(len(msg_in.detections)):
-
+    num_detections = len(msg_in.detections)
+    if num_detections>0:
+        # one row per detection: id, size, position.xyz, orientation.xyzw
+        detection_array = np.empty((num_detections, 9))
+        for i in range(num_detections):
             msg = msg_in.detections[i]
-            
-            detection_dict[msg.id[0]] = {
-            'id': msg.id[0],
-            'size': msg.size[0],
-            'position': [msg.pose.pose.pose.position.x, msg.pose.pose.pose.position.y, 
-                msg.pose.pose.pose.position.z],
-            'orientation': [msg.pose.pose.pose.orientation.x, msg.pose.pose.pose.orientation.y, 
-                msg.pose.pose.pose.orientation.z, msg.pose.pose.pose.orientation.w]
-            }
-        return detection_dict
+            p = msg.pose.pose.pose.position
+            o = msg.pose.pose.pose.orientation
+            detection_array[i] = (msg.id[0], msg.size[0], p.x, p.y, p.z, o.x, o.y, o.z, o.w)
+
+        return {
+            'ids': detection_array[:, 0].astype(np.int32),
+            'sizes': detection_array[:, 1],
+            'positions': detection_array[:, 2:5],
+            'orientations': detection_array[:, 5:9]}
     else:
         return None
 
+# message type -> parser for the deserialized message types, custom pbal messages
+# fall through to parse_custom_pbal_message when the lookup misses
+message_parsers = {
+    'std_msgs/Float32MultiArray': parse_float32_multi_array,
+    'apriltag_ros/AprilTagDetectionArray': parse_apriltag_detection_array,
+    'std_msgs/Int32': parse_apriltag_detection_Int32,
+    'std_msgs/Bool': parse_apriltag_detection_Bool,
+}
 
-msg_types = []
-if __name__ == "__main__":
 
-    dir_save_bagfile = '/home/thecube/Documents/pbal_experiments/gtsam_test_data'
-    # dir_save_bagfile = os.environ['CODE_BASE'] + '/data/rosbag_data/'
+# the pickle is written as a stream of independent records so that memory use is bounded by
+# messages_per_chunk rather than by the length of the bag, Helpers/converted_bag_helper.py reads it back
+messages_per_chunk = 10000
 
+# once the fixed layout arrays of a bag add up to more than this, the array data of each record is written
+# out-of-band (pickle protocol 5) to a .npbuf file next to the pickle instead of being copied into it
+out_of_band_threshold_bytes = 64*1024*1024
 
-    pickle_dict = {}
+def dump_record(record, handle, buffer_handle):
+    if buffer_handle is None:
+        pickle.dump(record, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        return
 
-    for fname in os.listdir(dir_save_bagfile):
-        fname_list = fname.split('.')
-        if fname_list[1]=='pickle':
-            pickle_dict[fname_list[0]]=True
+    buffers = []
+    pickle.dump(record, handle, protocol=5, buffer_callback=buffers.append)
 
-    unpickled_list = []
-    for fname in os.listdir(dir_save_bagfile):
-        fname_list = fname.split('.')
-        if fname_list[1]=='bag' and fname_list[0] not in pickle_dict:
-            unpickled_list.append(fname)
+    # each buffer is stored as a uint64 byte count followed by the raw bytes
+    for buffer in buffers:
+        raw = buffer.raw()
+        buffer_handle.write(struct.pack('<Q', raw.nbytes))
+        buffer_handle.write(raw)
 
-    for bagfile_name in unpickled_list:
-        fpath = os.path.join(dir_save_bagfile, bagfile_name)
-        print('Loading: ' + bagfile_name)
 
-        # build data structure
-        bridge = CvBridge()
-        data = {}
-        
-        #dictionary of video writers to store each video feed in its own .avi
-        video_feed_dict= {}
+# converts a single bag, each bag is independent so these run in parallel worker processes
+def convert_bag(dir_save_bagfile, bagfile_name):
+    msg_types = []
 
-        # fill out topics
-        with rosbag.Bag(fpath, 'r') as bag:
-            for topic, msg, time, in bag.read_messages():
+    fpath = os.path.join(dir_save_bagfile, bagfile_name)
+    print('Loading: ' + bagfile_name)
 
-                if msg._type not in msg_types:
-                    msg_types.append(msg._type)
+    spath = os.path.join(dir_save_bagfile, 
+        os.path.splitext(bagfile_name)[0])
 
-                # parse topic by message type            
-                if msg._type == 'geometry_msgs/WrenchStamped':
-                    msg = parse_wrench_stamped(msg)
-                
-                elif msg._type == 'geometry_msgs/PoseStamped':
-                    msg = parse_pose_stamped(msg)
-                
-                elif msg._type == 'geometry_msgs/TransformStamped':
-                    msg = parse_transform_stamped(msg)
-                
-                elif msg._type == 'std_msgs/Float32MultiArray':
-                    msg = msg.data
-                
-                elif msg._type == 'sensor_msgs/Image':
+    # the stream is written under a temporary name and only renamed to .pickle once the bag is done,
+    # so that an interrupted conversion is not mistaken for a finished one on the next run
+    partial_path = spath + '.partial'
+    partial_buffer_path = spath + '.npbuf.partial'
+
+    # build data structure
+    bridge = CvBridge()
+    
+    #dictionary of video writers to store each video feed in its own .avi
+    video_feed_dict= {}
+
+    # fill out topics
+    with rosbag.Bag(fpath, 'r') as bag, open(partial_path, 'wb') as handle:
+        topic_info = bag.get_type_and_topic_info().topics
+
+        fixed_layout_topics = []
+        other_topics = []
+        total_array_bytes = 0
+        for topic in topic_info:
+            if topic_info[topic].msg_type not in msg_types:
+                msg_types.append(topic_info[topic].msg_type)
+
+            if topic_info[topic].msg_type in fixed_layout_parsers:
+                fixed_layout_topics.append(topic)
+                num_fields = fixed_layout_parsers[topic_info[topic].msg_type][1]
+                total_array_bytes += 8*(1 + num_fields)*topic_info[topic].message_count
+            else:
+                other_topics.append(topic)
+
+        out_of_band = total_array_bytes >= out_of_band_threshold_bytes
+        buffer_handle = open(partial_buffer_path, 'wb') if out_of_band else None
+
+        pickle.dump({'format': converted_bag_format, 'messages_per_chunk': messages_per_chunk,
+            'out_of_band': out_of_band}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # fixed layout topics are read one at a time, straight into chunk arrays sized from the bag index
+        for topic in fixed_layout_topics:
+            print(topic[1:])
+            parser, num_fields = fixed_layout_parsers[topic_info[topic].msg_type]
+            num_messages = topic_info[topic].message_count
+
+            chunk_length = min(messages_per_chunk, num_messages)
+            time_array = np.empty(chunk_length)
+            data_array = np.empty((chunk_length, num_fields))
+            num_remaining = num_messages
+            i = 0
+
+            for _, raw_msg, time in bag.read_messages(topics=[topic], raw=True):
+                time_array[i] = time.to_sec()
+                data_array[i] = parser(raw_msg[1])
+                i += 1
+
+                if i == chunk_length:
+                    dump_record({topic[1:]: {'time': time_array, 'data': data_array}}, handle, buffer_handle)
+
+                    num_remaining -= chunk_length
+                    chunk_length = min(messages_per_chunk, num_remaining)
+                    time_array = np.empty(chunk_length)
+                    data_array = np.empty((chunk_length, num_fields))
+                    i = 0
+
+        # read_messages treats an empty topic list as every topic, so only read when there is something left
+        if len(other_topics)>0:
+            seen_topics = set()
+            chunk_dict = {}
+            chunk_count = 0
+
+            for topic, msg, time, in bag.read_messages(topics=other_topics):
+
+                msg_type = msg._type
+                parser = message_parsers.get(msg_type)
+
+                # parse topic by message type
+                if msg_type == 'sensor_msgs/Image':
                     #put meesage into the cv2 framework
-                    cv_image = bridge.imgmsg_to_cv2(msg, desired_encoding='bgr8')
-                    
+                    cv_image = image_to_bgr8(msg, bridge)
+                
                     #if we haven't seen topic yet, create a new video writer for it
                     #and add it to the dictionary
                     if topic not in video_feed_dict:
@@ -145,45 +230,72 @@ if __name__ == "__main__":
                         image_size = (image_width, image_height)
                         save_name = fpath.split('.')[0]+'_'+topic.split('/')[1]+'.avi'
                         video_feed_dict[topic]=cv2.VideoWriter(save_name, cv2.VideoWriter_fourcc(*'DIVX'), 30, image_size)
-                       
+                   
                     #have the video writer associated with the topic write the new frame
                     video_feed_dict[topic].write(cv_image)
 
                     msg = None
 
-                elif msg._type == 'apriltag_ros/AprilTagDetectionArray':
-                    msg = parse_apriltag_detection_array(msg)
+                elif parser is not None:
+                    msg = parser(msg)
 
-                elif msg._type == 'std_msgs/Int32':
-                    msg = parse_apriltag_detection_Int32(msg)
-
-                elif msg._type == 'std_msgs/Bool':
-                    msg = parse_apriltag_detection_Bool(msg)
-
-                elif 'pbal/' in msg._type:
+                elif 'pbal/' in msg_type:
                     msg = parse_custom_pbal_message(msg)
                     if msg is None:
                         continue
 
-                # add to data
-                if not (topic[1:] in data):
+                # add to the current chunk
+                if topic not in seen_topics:
                     print(topic[1:])
-                    data[topic[1:]] = [{'time': time.to_sec(), 'msg': msg}]
+                    seen_topics.add(topic)
+
+                if not (topic[1:] in chunk_dict):
+                    chunk_dict[topic[1:]] = [{'time': time.to_sec(), 'msg': msg}]
                 else:
-                    data[topic[1:]].extend([{'time': time.to_sec(), 'msg': msg}])
-                
-        #close all video writers, since we are done with the .bag file
-        for my_key in video_feed_dict:
-            video_feed_dict[my_key].release() 
+                    chunk_dict[topic[1:]].append({'time': time.to_sec(), 'msg': msg})
+
+                chunk_count += 1
+                if chunk_count == messages_per_chunk:
+                    dump_record(chunk_dict, handle, buffer_handle)
+                    chunk_dict = {}
+                    chunk_count = 0
+
+            if chunk_count > 0:
+                dump_record(chunk_dict, handle, buffer_handle)
+
+        if buffer_handle is not None:
+            buffer_handle.close()
+            
+    #close all video writers, since we are done with the .bag file
+    for my_key in video_feed_dict:
+        video_feed_dict[my_key].release() 
+
+    print(msg_types)
 
-        print(msg_types)
+    print('Saving: ' + os.path.splitext(bagfile_name)[0] + '.pickle')
+    if out_of_band:
+        os.replace(partial_buffer_path, spath + '.npbuf')
+    os.replace(partial_path, spath + '.pickle')
 
-        print('Saving: ' + os.path.splitext(bagfile_name)[0] + '.pickle')
-        spath = os.path.join(dir_save_bagfile, 
-            os.path.splitext(bagfile_name)[0])
 
-        with open(spath + '.pickle', 'wb') as handle:
-            pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+if __name__ == "__main__":
+
+    dir_save_bagfile = '/home/thecube/Documents/pbal_experiments/gtsam_test_data'
+    # dir_save_bagfile = os.environ['CODE_BASE'] + '/data/rosbag_data/'
+
+
+    pickle_dict = {}
+
+    for fname in os.listdir(dir_save_bagfile):
+        fname_list = fname.split('.')
+        if fname_list[1]=='pickle':
+            pickle_dict[fname_list[0]]=True
+
+    unpickled_list = []
+    for fname in os.listdir(dir_save_bagfile):
+        fname_list = fname.split('.')
+        if fname_list[1]=='bag' and fname_list[0] not in pickle_dict:
+            unpickled_list.append(fname)
 
-        with open(spath + '.pickle', 'rb') as handle:
-            b = pickle.load(handle)
+    with multiprocessing.Pool() as pool:
+        pool.map(partial(convert_bag, dir_save_bagfile), unpickled_list)
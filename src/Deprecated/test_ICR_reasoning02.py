@@ -9,7 +9,7 @@ sys.path.insert(0, gparentdir)
 
 
 import json
-import pickle
+from Helpers.converted_bag_helper import load_converted_bag
 import numpy as np
 import scipy
 
@@ -150,7 +150,7 @@ if __name__ == '__main__':
 	april_tag_pose_marker_frame_homog =  pose_list_to_matrix([-apriltag_pos[0], -apriltag_pos[1], 0,0.0,0.0,0.0,1.0])
 	vertex_array_marker_frame = np.dot(april_tag_pose_marker_frame_homog,object_vertex_array)
 
-	data_dict = synchronize_messages(pickle.load(open(my_path+fname, 'rb')),dt=dt_resolution)
+	data_dict = synchronize_messages(load_converted_bag(my_path+fname),dt=dt_resolution)
 
 	friction_parameter_dict,last_slide_time_dict,sliding_state_dict = friction_reasoning.initialize_friciton_dictionaries()
 
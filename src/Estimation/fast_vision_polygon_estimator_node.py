@@ -47,7 +47,7 @@ class polygon_vision_operator(object):
         if self.visited_array is None:
             self.visited_array = np.zeros([len(cv_image),len(cv_image[0])])
 
-        measured_wrench_ee = np.array(self.rm.measured_contact_wrench)
+        measured_wrench_ee = self.rm.measured_contact_wrench
 
         if measured_wrench_ee[0]>2.0:
             self.seed_point_location = None
@@ -40,10 +40,10 @@ def initialize_friction_dictionaries():
 def convert_friction_param_dict_to_array(friction_parameter_dict):
     friction_parameter_dict['acr'] = np.array(friction_parameter_dict['acr'])
     friction_parameter_dict['acl'] = np.array(friction_parameter_dict['acl'])
-    friction_parameter_dict['aer'] = np.array(friction_parameter_dict['aer'])
-    friction_parameter_dict['ael'] = np.array(friction_parameter_dict['ael'])
-    friction_parameter_dict['ber'] = np.array(friction_parameter_dict['ber'])
-    friction_parameter_dict['bel'] = np.array(friction_parameter_dict['bel'])
+    friction_parameter_dict['aer'] = np.ascontiguousarray(friction_parameter_dict['aer'], dtype=np.float64).reshape(-1,3)
+    friction_parameter_dict['ael'] = np.ascontiguousarray(friction_parameter_dict['ael'], dtype=np.float64).reshape(-1,3)
+    friction_parameter_dict['ber'] = np.asarray(friction_parameter_dict['ber'], dtype=np.float64)
+    friction_parameter_dict['bel'] = np.asarray(friction_parameter_dict['bel'], dtype=np.float64)
 
 def compute_sliding_state_contact(sliding_state_dict,friction_parameter_dict,last_slide_time_dict,t0,measured_contact_wrench,contact_friction_cone_boundary_margin,reset_time_length):
 
@@ -183,7 +183,6 @@ class gtsam_advanced_estimator(object):
             # print(test_val0,test_val1)
 
 
-        self.vertex_positions_wm_current = [[], []]
         self.vertex_positions_obj_current = self.test_object_vertex_array[0:2,:] + 0.0
         
 
@@ -213,17 +212,7 @@ class gtsam_advanced_estimator(object):
     
 
 
-        for i in range(self.num_vertices):
-            vertex_obj_frame_temp = np.array([self.vertex_positions_obj_current[0][i], self.vertex_positions_obj_current[1][i]])
-            
-            r_wm_vertex_temp, dummy0, dummy1, dummy2 = \
-            transform_pts_obj_to_wm(vertex_obj_frame_temp, r_obj_in_ee_frame, theta_obj_in_ee, self.hand_pose_list_start[0:2], self.hand_pose_list_start[2])
-
-            self.vertex_positions_wm_current[0].append(r_wm_vertex_temp[0])
-            self.vertex_positions_wm_current[1].append(r_wm_vertex_temp[1])
-
-
-        self.vertex_positions_wm_current = np.array(self.vertex_positions_wm_current)  
+        self.vertex_positions_wm_current = transform_vertex_array_obj_to_wm(self.vertex_positions_obj_current, r_obj_in_ee_frame, theta_obj_in_ee, self.hand_pose_list_start[0:2], self.hand_pose_list_start[2])
 
         self.h_ground_current = np.min(self.vertex_positions_wm_current[0])
 
@@ -289,30 +278,18 @@ class gtsam_advanced_estimator(object):
             self.theta_obj_in_wm_current = result.atVector(self.symbol_dict['theta_obj_in_wm'][self.current_time_step])[0]
             self.r_obj_in_wm_current = np.array([r0_obj_in_wm_current,r1_obj_in_wm_current])
 
-        self.vertex_positions_wm_current = [[], []]
-        self.vertex_positions_obj_current = [[], []]
+        self.vertex_positions_obj_current = np.empty((2,self.num_vertices))
 
         for i in range(self.num_vertices):
-            self.vertex_positions_obj_current[0].append(result.atVector(self.symbol_dict['r0_point_in_obj_frame'][i])[0])
-            self.vertex_positions_obj_current[1].append(result.atVector(self.symbol_dict['r1_point_in_obj_frame'][i])[0])
-
-            self.test_object_vertex_array[0, i] = self.vertex_positions_obj_current[0][i]
-            self.test_object_vertex_array[1, i] = self.vertex_positions_obj_current[1][i]
-
-
-            vertex_obj_frame_temp = np.array([self.vertex_positions_obj_current[0][i], self.vertex_positions_obj_current[1][i]])
-     
-            r_wm_vertex_temp, dummy0, dummy1, dummy2 = \
-            transform_pts_obj_to_wm(vertex_obj_frame_temp, self.r_obj_in_wm_current, self.theta_obj_in_wm_current, np.array([0.0,0.0]), -np.pi)
-
-            self.vertex_positions_wm_current[0].append(r_wm_vertex_temp[0])
-            self.vertex_positions_wm_current[1].append(r_wm_vertex_temp[1])
+            self.vertex_positions_obj_current[0, i] = result.atVector(self.symbol_dict['r0_point_in_obj_frame'][i])[0]
+            self.vertex_positions_obj_current[1, i] = result.atVector(self.symbol_dict['r1_point_in_obj_frame'][i])[0]
 
             self.mglcostheta_current[i]=result.atVector(self.symbol_dict['mglcostheta'][i])[0]
             self.mglsintheta_current[i]=result.atVector(self.symbol_dict['mglsintheta'][i])[0]
 
-        self.vertex_positions_obj_current = np.array(self.vertex_positions_obj_current)
-        self.vertex_positions_wm_current = np.array(self.vertex_positions_wm_current)
+        self.test_object_vertex_array[0:2] = self.vertex_positions_obj_current
+
+        self.vertex_positions_wm_current = transform_vertex_array_obj_to_wm(self.vertex_positions_obj_current, self.r_obj_in_wm_current, self.theta_obj_in_wm_current, np.array([0.0,0.0]), -np.pi)
 
 
         self.mglcostheta_current = [0.0]*self.num_vertices
@@ -390,7 +367,7 @@ class gtsam_advanced_estimator(object):
         self.measured_pose_list[-1] = np.array(measured_pose)
 
     def add_hand_wrench_measurement(self, measured_wrench):
-        self.measured_wrench_list[-1] = np.array(measured_wrench)
+        self.measured_wrench_list[-1] = np.asarray(measured_wrench)
 
     def add_sliding_state(self, sliding_state):
         self.sliding_state_list[-1] = sliding_state
@@ -1340,6 +1317,22 @@ def transform_pts_obj_to_wm(r_point_in_obj_frame, r_obj_in_ee_frame, theta_obj_i
 
     return r_out, pr_out_pr_point_in_obj_frame, pr_out_pr_obj_in_ee_frame, pr_out_ptheta_obj_in_ee
 
+#same transform as transform_pts_obj_to_wm, applied to a whole (2,N) array of points at once (no jacobians)
+def transform_vertex_array_obj_to_wm(vertex_array_in_obj_frame, r_obj_in_ee_frame, theta_obj_in_ee, r_ee_in_wm, theta_hand):
+    rot_mat_hand = np.array([[-np.cos(theta_hand), np.sin(theta_hand)], 
+                             [-np.sin(theta_hand), -np.cos(theta_hand)]])
+
+    rot_mat_obj = np.array([[ np.cos(theta_obj_in_ee), -np.sin(theta_obj_in_ee)], 
+                            [ np.sin(theta_obj_in_ee),  np.cos(theta_obj_in_ee)]])
+
+    rot_mat_out = np.dot(rot_mat_hand, rot_mat_obj)
+    r_offset = np.dot(rot_mat_hand, r_obj_in_ee_frame)+r_ee_in_wm
+
+    vertex_array_out = np.dot(rot_mat_out, vertex_array_in_obj_frame)
+    vertex_array_out += r_offset[:, np.newaxis]
+
+    return vertex_array_out
+
 
 def estimate_external_COP(test_object_vertex_array, r_obj_in_ee_frame, theta_obj_in_ee, hand_pose, measured_world_manipulation_wrench, contact_indices):
     Pa_obj = test_object_vertex_array[0:2,contact_indices[0]]
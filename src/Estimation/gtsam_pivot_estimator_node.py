@@ -76,7 +76,7 @@ if __name__ == '__main__':
         rm.unpack_all()
 
         hand_pose_pivot_estimator = np.array([rm.ee_pose_in_world_manipulation_list[0],rm.ee_pose_in_world_manipulation_list[1], kh.quatlist_to_theta(rm.ee_pose_in_world_manipulation_list[3:])])
-        measured_wrench_pivot_estimator = np.array(rm.measured_world_manipulation_wrench)
+        measured_wrench_pivot_estimator = rm.measured_world_manipulation_wrench
 
         my_pivot_estimator.add_data_point(hand_pose_pivot_estimator,measured_wrench_pivot_estimator,rm.sliding_state)
 
@@ -41,7 +41,8 @@ def get_shape_prior():
 
     rm.unregister_all()
 
-    return np.vstack(vertex_list).T
+    #(4,N) array of homogeneous vertex positions, one column per vertex
+    return np.asarray(vertex_list, dtype=np.float64).T.copy()
 
 if __name__ == '__main__':
     global rospy
@@ -127,7 +128,7 @@ if __name__ == '__main__':
 
 
         hand_pose_pivot_estimator = np.array([rm.ee_pose_in_world_manipulation_list[0],rm.ee_pose_in_world_manipulation_list[1], theta_hand])
-        measured_wrench_pivot_estimator = np.array(rm.measured_world_manipulation_wrench)
+        measured_wrench_pivot_estimator = rm.measured_world_manipulation_wrench
 
         if rm.torque_cone_boundary_test is not None and rm.torque_cone_boundary_test:
 
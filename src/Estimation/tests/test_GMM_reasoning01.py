@@ -9,7 +9,7 @@ sys.path.insert(0, gparentdir)
 
 
 import json
-import pickle
+from Helpers.converted_bag_helper import load_converted_bag
 import numpy as np
 import scipy
 
@@ -155,7 +155,7 @@ if __name__ == '__main__':
 	
 
 
-	data_dict = synchronize_messages(pickle.load(open(my_path+fname, 'rb')),dt=dt_resolution)
+	data_dict = synchronize_messages(load_converted_bag(my_path+fname),dt=dt_resolution)
 
 	
 
@@ -3,6 +3,7 @@ import os,sys,inspect
 currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 sys.path.insert(0,os.path.dirname(os.path.dirname(currentdir)))
 
+import math
 import numpy as np
 import time
 
@@ -35,6 +36,11 @@ class gtsam_operator(object):
         # object_vertex_array = get_shape_prior(add_noise = False)
         self.num_vertices = len(object_vertex_array[0])
 
+        #filled in place every tick when building the published polygon estimate
+        self.vertex_array_buffer = np.empty((3, self.num_vertices))
+        self.mgl_cos_theta_buffer = np.empty(self.num_vertices)
+        self.mgl_sin_theta_buffer = np.empty(self.num_vertices)
+
         print('shape prior acquired')
 
         self.rm.wait_for_necessary_data()
@@ -62,7 +68,7 @@ class gtsam_operator(object):
         self.corner_contact_dict = None
 
         self.wall_contact_force_margin = 3.0
-
+        self.update_wall_contact_constraints()
 
 
         self.torque_bounds_out = None
@@ -95,6 +101,22 @@ class gtsam_operator(object):
     def unpack_all(self):
         self.rm.unpack_all()
 
+    def update_wall_contact_constraints(self):
+        #cache the ground friction constraints (and output buffers for the wall contact check)
+        #so that they are only rebuilt when ros_manager holds a different friction parameter dict.
+        #the dict is compared by identity rather than through rm.friction_parameter_has_new, since
+        #that flag is shared by every client of rm and can be consumed by another unpack first
+        friction_parameter_dict = self.rm.friction_parameter_dict
+        self.cached_friction_parameter_dict = friction_parameter_dict
+
+        self.aer = friction_parameter_dict['aer']
+        self.ael = friction_parameter_dict['ael']
+        self.ber_wall_threshold = friction_parameter_dict['ber'] + self.wall_contact_force_margin
+        self.bel_wall_threshold = friction_parameter_dict['bel'] + self.wall_contact_force_margin
+
+        self.aer_buffer = np.empty(len(self.aer))
+        self.ael_buffer = np.empty(len(self.ael))
+
     def update_estimator(self):
         
 
@@ -108,13 +130,18 @@ class gtsam_operator(object):
         wall_flag = -1
 
         
-        if len(self.rm.friction_parameter_dict['aer'])>0:
-            wall_contact_right_bool = any(np.dot(self.rm.friction_parameter_dict['aer'],self.rm.measured_world_manipulation_wrench) > self.rm.friction_parameter_dict['ber'] + self.wall_contact_force_margin)
+        if self.rm.friction_parameter_dict is not self.cached_friction_parameter_dict:
+            self.update_wall_contact_constraints()
+
+        if len(self.aer)>0:
+            np.matmul(self.aer,self.rm.measured_world_manipulation_wrench,out=self.aer_buffer)
+            wall_contact_right_bool = (self.aer_buffer > self.ber_wall_threshold).any()
         else:
             wall_contact_right_bool = True
 
-        if len(self.rm.friction_parameter_dict['ael'])>0:
-            wall_contact_left_bool = any(np.dot(self.rm.friction_parameter_dict['ael'],self.rm.measured_world_manipulation_wrench) > self.rm.friction_parameter_dict['bel'] + self.wall_contact_force_margin)
+        if len(self.ael)>0:
+            np.matmul(self.ael,self.rm.measured_world_manipulation_wrench,out=self.ael_buffer)
+            wall_contact_left_bool = (self.ael_buffer > self.bel_wall_threshold).any()
         else:
             wall_contact_left_bool = True
 
@@ -135,11 +162,13 @@ class gtsam_operator(object):
         #     elif self.rm.command_msg['mode']==1:
         #         wall_contact_on = False
                 
-        theta_hand = kh.quatlist_to_theta(self.rm.ee_pose_in_world_manipulation_list[3:])
+        #same as kh.quatlist_to_theta, inlined
+        qx, qy, qz, qw = self.rm.ee_pose_in_world_manipulation_quat
+        theta_hand = math.atan2(-2*(qx*qy+qw*qz), 1-2*(qw*qw+qx*qx))
 
         hand_pose_pivot_estimator = np.array([self.rm.ee_pose_in_world_manipulation_list[0],self.rm.ee_pose_in_world_manipulation_list[1], theta_hand])
-        measured_wrench_pivot_estimator = np.array(self.rm.measured_world_manipulation_wrench)
-        measured_wrench_ee = np.array(self.rm.measured_contact_wrench)
+        measured_wrench_pivot_estimator = self.rm.measured_world_manipulation_wrench
+        measured_wrench_ee = self.rm.measured_contact_wrench
 
         self.my_cm_reasoner.update_pose_and_wrench(hand_pose_pivot_estimator,measured_wrench_pivot_estimator,measured_wrench_ee)
         self.my_cm_reasoner.update_torque_cone_boundary_flag(self.rm.torque_cone_boundary_test,self.rm.torque_cone_boundary_flag)
@@ -322,34 +351,24 @@ class gtsam_operator(object):
                     self.pivot_frame_out = [pn_wm,pt_wm,hand_front_center_world[2]]
                     # self.rm.pub_pivot_frame_estimated([pn_wm,pt_wm,hand_front_center_world[2]])
 
-                contact_indices = []
-                vertex_array_n = []
-                vertex_array_t = []
-                vertex_array_z = []
-
-                mgl_cos_theta_list = []
-                mgl_sin_theta_list = []
+                vertex_array_out = self.vertex_array_buffer
+                vertex_array_out[0:2] = current_estimate_dict['vertex_positions_wm_current']
+                vertex_array_out[2] = hand_front_center_world[2]
 
-                count = 0
-  
-                for i in range(len(current_estimate_dict['vertex_positions_wm_current'][0])):
-                    
-                    vertex_array_n.append(current_estimate_dict['vertex_positions_wm_current'][0][i])
-                    vertex_array_t.append(current_estimate_dict['vertex_positions_wm_current'][1][i])
-                    vertex_array_z.append(hand_front_center_world[2])
+                mgl_cos_theta_list = self.mgl_cos_theta_buffer
+                mgl_sin_theta_list = self.mgl_sin_theta_buffer
+                mgl_cos_theta_list[:] = current_estimate_dict['mglcostheta_current']
+                mgl_sin_theta_list[:] = current_estimate_dict['mglsintheta_current']
 
-                    mgl_cos_theta_list.append(current_estimate_dict['mglcostheta_current'][i])
-                    mgl_sin_theta_list.append(current_estimate_dict['mglsintheta_current'][i])
-
-                    if self.current_estimator.contact_vertices is not None and i in self.current_estimator.contact_vertices:
-                        contact_indices.append(i)
-      
-                vertex_array_out = np.array([vertex_array_n,vertex_array_t,vertex_array_z])
+                if self.current_estimator.contact_vertices is not None:
+                    contact_indices = np.flatnonzero(np.isin(np.arange(self.num_vertices), self.current_estimator.contact_vertices))
+                else:
+                    contact_indices = []
 
                 if wall_flag == 0:
-                    wall_contact_indices = [np.argmin(vertex_array_out[1])]
+                    wall_contact_indices = [int(vertex_array_out[1].argmin())]
                 elif wall_flag == 1:
-                    wall_contact_indices = [np.argmax(vertex_array_out[1])]
+                    wall_contact_indices = [int(vertex_array_out[1].argmax())]
 
                 rot_mat_hand = np.array([[-np.cos(theta_hand), np.sin(theta_hand)], 
                                       [-np.sin(theta_hand), -np.cos(theta_hand)]])
@@ -399,11 +418,14 @@ class gtsam_operator(object):
 
         elif self.polygon_contact_dict is not None and self.polygon_contact_dict['vertex_array_out'] is not None:
             
-            if wall_flag == 0:
-                wall_contact_indices = [np.argmin(self.polygon_contact_dict['vertex_array_out'][1])]
-                self.polygon_contact_dict['wall_contact_indices'] = wall_contact_indices
-            elif wall_flag == 1:
-                wall_contact_indices = [np.argmax(self.polygon_contact_dict['vertex_array_out'][1])]
+            if wall_flag == 0 or wall_flag == 1:
+                t_row = self.polygon_contact_dict['vertex_array_out'][1]
+
+                if wall_flag == 0:
+                    wall_contact_indices = [int(t_row.argmin())]
+                else:
+                    wall_contact_indices = [int(t_row.argmax())]
+
                 self.polygon_contact_dict['wall_contact_indices'] = wall_contact_indices
 
 
@@ -450,7 +472,8 @@ def get_shape_prior(add_noise = False, noise_diameter = 0.0, load_mode = False,
 
     rm.unregister_all()
 
-    return np.vstack(vertex_list).T
+    #(4,N) array of homogeneous vertex positions, one column per vertex
+    return np.asarray(vertex_list, dtype=np.float64).T.copy()
 
 
 
@@ -15,7 +15,7 @@ import cv2
 from cvxopt import matrix, solvers
 import json
 import numpy as np
-import pickle
+from Helpers.converted_bag_helper import load_converted_bag
 import PlottingandVisualization.image_overlay_helper as ioh
 from Modelling.system_params import SystemParams
 import time
@@ -121,8 +121,7 @@ if __name__ == '__main__':
     if april_tag_cam == 'near':
         camera_to_world_homog = near_camera_to_world_homog
 
-    with open(my_path + fname + '.pickle', 'rb') as handle:
-        data_dict = pickle.load(handle, encoding='latin1')
+    data_dict = load_converted_bag(my_path + fname + '.pickle', encoding='latin1')
 
     synched_data_dict = ioh.synchronize_messages(data_dict)
 
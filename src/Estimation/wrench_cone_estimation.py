@@ -65,9 +65,11 @@ if __name__ == '__main__':
 
     hand_data_point_count = 0
     hand_update_number = 100
+    hand_points_until_update = hand_update_number
 
     ground_data_point_count = 0
     ground_update_number = 100
+    ground_points_until_update = ground_update_number
 
     max_update_number = max(hand_update_number,ground_update_number)
 
@@ -85,26 +87,31 @@ if __name__ == '__main__':
         # updating quantiles for robot friction cone
         if rm.end_effector_wrench_has_new and (not wall_contact_on):
             hand_data_point_count +=1
-            update_robot_friction_cone = hand_data_point_count%hand_update_number == 0
+
+            # count down to the next update rather than taking hand_data_point_count%hand_update_number
+            hand_points_until_update -=1
+            update_robot_friction_cone = hand_points_until_update == 0
+            if update_robot_friction_cone:
+                hand_points_until_update = hand_update_number
 
             robot_friction_estimator.add_data_point(rm.measured_contact_wrench)
 
 
         if rm.end_effector_wrench_world_manipulation_frame_has_new:
             ground_data_point_count +=1
-            update_ground_friction_cone = ground_data_point_count%ground_update_number == 0
-
-            if (ground_data_point_count % 2) == 0 and (not wall_contact_on):
 
-                ground_hull_estimator.add_data_point(
-                    np.array([rm.measured_world_manipulation_wrench[0],
-                              rm.measured_world_manipulation_wrench[1]]))
+            ground_points_until_update -=1
+            update_ground_friction_cone = ground_points_until_update == 0
+            if update_ground_friction_cone:
+                ground_points_until_update = ground_update_number
 
-                ground_hull_estimator.add_data_point(
-                    np.array([ rm.measured_world_manipulation_wrench[0],
-                              -rm.measured_world_manipulation_wrench[1]]))
+            # every other data point
+            if not (ground_data_point_count & 1) and (not wall_contact_on):
 
-                ground_hull_estimator.add_data_point((10**-7)*np.array([random.random()-.5,random.random()-.5]))
+                ground_hull_estimator.add_data_points(
+                    np.array([[ rm.measured_world_manipulation_wrench[0], rm.measured_world_manipulation_wrench[1]],
+                              [ rm.measured_world_manipulation_wrench[0],-rm.measured_world_manipulation_wrench[1]],
+                              [(10**-7)*(random.random()-.5),(10**-7)*(random.random()-.5)]]))
            
         # updating robot friction parameters
         if update_robot_friction_cone:
@@ -0,0 +1,108 @@
+import os
+import pickle
+import struct
+
+import numpy as np
+
+# Deprecated/rosbag_to_pickle.py writes each converted bag as a stream of independent pickle records:
+# a header record, then one {topic: chunk} record per chunk of messages. load_converted_bag stitches
+# the chunks back into a single {topic: data} dict. for large bags the array data of each record is stored
+# out-of-band (pickle protocol 5) in a .npbuf file next to the pickle
+converted_bag_format = 'pbal_converted_bag_stream'
+
+# yields the out-of-band buffers in the order they were written, each is stored
+# as a uint64 byte count followed by the raw bytes
+def read_out_of_band_buffers(buffer_handle):
+    header = buffer_handle.read(8)
+    while len(header) == 8:
+        buffer = bytearray(struct.unpack('<Q', header)[0])
+        buffer_handle.readinto(buffer)
+        yield buffer
+        header = buffer_handle.read(8)
+
+# the converter stores the stamped geometry topics as {'time': (N,), 'data': (N,k)} arrays,
+# this turns one back into the list of {'time', 'msg'} dicts that every other topic uses
+def fixed_layout_to_message_list(topic_data):
+    return [{'time': time, 'msg': msg} for time, msg in zip(topic_data['time'].tolist(), topic_data['data'].tolist())]
+
+# apriltag detections are stored as per-field arrays {'ids', 'sizes', 'positions', 'orientations'},
+# this turns one back into the {id: {'id', 'size', 'position', 'orientation'}} dict the scripts index by tag id
+def detection_arrays_to_dict(detections):
+    detection_dict = {}
+    for tag_id, size, position, orientation in zip(detections['ids'].tolist(), detections['sizes'].tolist(),
+        detections['positions'].tolist(), detections['orientations'].tolist()):
+        detection_dict[tag_id] = {'id': tag_id, 'size': size, 'position': position, 'orientation': orientation}
+
+    return detection_dict
+
+def is_detection_message_list(message_list):
+    for message in message_list:
+        if message['msg'] is not None:
+            return isinstance(message['msg'], dict) and 'ids' in message['msg'] and 'positions' in message['msg']
+    return False
+
+# by default the fixed layout topics are returned as message lists, like every other topic, so that
+# ioh.synchronize_messages and the scripts indexing data_dict[topic][i]['msg'] work unchanged.
+# fixed_layout_as_arrays=True keeps them as arrays instead, detections_as_arrays=True does the same
+# for the apriltag detections
+def load_converted_bag(fpath, encoding='ASCII', fixed_layout_as_arrays=False, detections_as_arrays=False):
+    data = load_converted_bag_records(fpath, encoding)
+
+    for topic in data:
+        if isinstance(data[topic], dict):
+            if not fixed_layout_as_arrays:
+                data[topic] = fixed_layout_to_message_list(data[topic])
+
+        elif not detections_as_arrays and is_detection_message_list(data[topic]):
+            for message in data[topic]:
+                if message['msg'] is not None:
+                    message['msg'] = detection_arrays_to_dict(message['msg'])
+
+    return data
+
+def load_converted_bag_records(fpath, encoding):
+    buffer_path = os.path.splitext(fpath)[0] + '.npbuf'
+    with open(fpath, 'rb') as handle:
+        if not os.path.exists(buffer_path):
+            return read_converted_bag_records(handle, encoding, None)
+
+        # every record takes its buffers from the same iterator, so they are consumed in write order
+        with open(buffer_path, 'rb') as buffer_handle:
+            return read_converted_bag_records(handle, encoding, read_out_of_band_buffers(buffer_handle))
+
+def read_converted_bag_records(handle, encoding, buffers):
+    header = pickle.load(handle, encoding=encoding, buffers=buffers)
+
+    # pickles written before the streaming format hold the whole dict in a single record
+    if not (isinstance(header, dict) and header.get('format') == converted_bag_format):
+        return header
+
+    if header.get('out_of_band', False) and buffers is None:
+        raise IOError(handle.name + ' stores its array data out-of-band, but the .npbuf file that goes with it is missing')
+
+    chunk_lists = {}
+    while True:
+        try:
+            chunk_dict = pickle.load(handle, encoding=encoding, buffers=buffers)
+        except EOFError:
+            break
+
+        for topic in chunk_dict:
+            if topic not in chunk_lists:
+                chunk_lists[topic] = []
+            chunk_lists[topic].append(chunk_dict[topic])
+
+    data = {}
+    for topic in chunk_lists:
+        if isinstance(chunk_lists[topic][0], dict):
+            # fixed layout topic, concatenate the array chunks
+            data[topic] = {
+                'time': np.concatenate([chunk['time'] for chunk in chunk_lists[topic]]),
+                'data': np.concatenate([chunk['data'] for chunk in chunk_lists[topic]]),
+            }
+        else:
+            data[topic] = []
+            for chunk in chunk_lists[topic]:
+                data[topic].extend(chunk)
+
+    return data
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 # this function finds theta_mod such that |theta_mod-theta_ref|<= pi and
@@ -141,8 +142,9 @@ def wrench_reference_point_change(wrench_source, vector_from_new_ref):
   
 def quatlist_to_theta(quat_list):
     #converts fraka quaternion to sagittal plane angle
-    pose_homog = matrix_from_trans_and_quat(quat = quat_list)
-    return np.arctan2(-pose_homog[1,0], -pose_homog[0,0])   
+    #equivalent to arctan2(-r10,-r00) of the rotation matrix, without building the matrix
+    qx, qy, qz, qw = quat_list[0], quat_list[1], quat_list[2], quat_list[3]
+    return math.atan2(-2*(qx*qy+qw*qz), 1-2*(qw*qw+qx*qx))
 
 def theta_to_quatlist(theta):
     #converts sagittal <now in world manipulation frame, which is right-handed, with z axes aligned!! -Orion> plane angle to franka quaternion
@@ -172,15 +174,11 @@ def get_transform_homog(target_frame_pose_list, source_frame_pose_list):
 def invert_transform_homog(homog_in):
     R = homog_in[0:3,0:3]
     T = homog_in[0:3,3]
-    bottom_row = homog_in[3,:]
 
-    R_new = R.T
-    T_new = -np.dot(R_new,T)
-
-    T_new = np.array([T_new]).T
-    bottom_row = np.array([bottom_row])
-
-    homog_inv = np.vstack([np.hstack([R_new,T_new]),bottom_row])
+    homog_inv = np.empty((4,4))
+    homog_inv[0:3,0:3] = R.T
+    homog_inv[0:3,3] = -np.dot(R.T,T)
+    homog_inv[3,:] = homog_in[3,:]
 
     return homog_inv
 
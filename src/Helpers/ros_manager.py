@@ -388,6 +388,7 @@ class ros_manager(object):
 			self.ee_pose_in_world_manipulation_time = None
 			self.ee_pose_in_world_manipulation_list = None
 			self.ee_pose_in_world_manipulation_homog = None
+			self.ee_pose_in_world_manipulation_quat = None
 
 			if not self.load_mode:
 				self.subscriber_dict[topic] = rospy.Subscriber(
@@ -1330,6 +1331,7 @@ class ros_manager(object):
 				self.ee_pose_in_world_manipulation_time = self.ee_pose_in_world_manipulation.header.stamp.to_sec()
 				self.ee_pose_in_world_manipulation_list = pmh.pose_stamped2list(self.ee_pose_in_world_manipulation)
 			self.ee_pose_in_world_manipulation_homog = kh.matrix_from_pose_list(self.ee_pose_in_world_manipulation_list)
+			self.ee_pose_in_world_manipulation_quat = tuple(self.ee_pose_in_world_manipulation_list[3:7])
 
 			self.ee_pose_in_world_manipulation_has_new = True
 		else:
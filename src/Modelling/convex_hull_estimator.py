@@ -24,7 +24,9 @@ class ConvexHullEstimator(object):
         self.closed=closed
         self.theta_range=theta_range
         self.num_external_params = len(self.theta_range)
-        self.A_external_stats_intermediate = np.zeros([self.num_external_params,2])
+
+        #(num_external_params,2) basis of constraint directions, computed once and reused for every data point
+        self.A_external_stats_intermediate = np.stack([np.cos(self.theta_range),np.sin(self.theta_range)],axis=1).astype(np.float64,copy=False)
         self.B_external_stats_intermediate = np.zeros(self.num_external_params)
         self.stats_external_list = []
         # self.distance_threshold = distance_threshold
@@ -32,8 +34,6 @@ class ConvexHullEstimator(object):
         for i in range(self.num_external_params):
            # self.stats_external_list.append(livestats.LiveStats([quantile_value]))
            self.stats_external_list.append(BoundaryEstimator(update_rate=boundary_update_rate,max_update_step_ratio=boundary_max_update_step_ratio))
-           self.A_external_stats_intermediate[i][0] = np.cos(self.theta_range[i])
-           self.A_external_stats_intermediate[i][1] = np.sin(self.theta_range[i])
 
     def add_data_point(self,data_point):
         b_temp = np.dot(self.A_external_stats_intermediate,data_point)
@@ -41,27 +41,36 @@ class ConvexHullEstimator(object):
             # self.stats_external_list[i].add(b_temp[i])
             self.stats_external_list[i].add_data_point(b_temp[i],can_increase=True)
 
+    #adds each row of data_points (shape (M,2)) in order, projecting all of them in a single matmul
+    def add_data_points(self,data_points):
+        b_temp = np.dot(data_points,self.A_external_stats_intermediate.T).T.tolist()
+        for i in range(self.num_external_params):
+            boundary_estimator = self.stats_external_list[i]
+            for val in b_temp[i]:
+                boundary_estimator.add_data_point(val,can_increase=True)
+
     def update_quantile_list(self):
         for i in range(self.num_external_params):
             # self.B_external_stats_intermediate[i] = self.stats_external_list[i].quantiles()[0][1]
             self.B_external_stats_intermediate[i] = self.stats_external_list[i].get_boundary_val()
 
-    def enumerate_vertices_of_constraint_polygon(self,theta_list,b_list,closed=True):
+    def enumerate_vertices_of_constraint_polygon(self,theta_list,b_list,closed=True,A=None):
         
         if len(theta_list)<3:
             return np.array([]),np.array([])
 
         num_constraints = len(theta_list)
-        A = np.zeros([num_constraints,2])
         B = np.array(b_list) + (1e-7)
 
         vertex_x_list = []
         vertex_y_list = []
 
-        #build constraint matrix for the polygon
-        for i in range(num_constraints):
-            A[i][0] = np.cos(theta_list[i])
-            A[i][1] = np.sin(theta_list[i])
+        #build constraint matrix for the polygon (unless the caller already has it)
+        if A is None:
+            A = np.zeros([num_constraints,2])
+            for i in range(num_constraints):
+                A[i][0] = np.cos(theta_list[i])
+                A[i][1] = np.sin(theta_list[i])
 
         theta_A=theta_list[-1]
         theta_B=theta_list[0]
@@ -431,7 +440,7 @@ class ConvexHullEstimator(object):
         self.update_quantile_list()
 
         #find interior polygon of the boundaries from the quantile estimates
-        self.exterior_polygon_vertex_x_list, self.exterior_polygon_vertex_y_list = self.enumerate_vertices_of_constraint_polygon(self.theta_range,self.B_external_stats_intermediate,closed=True)
+        self.exterior_polygon_vertex_x_list, self.exterior_polygon_vertex_y_list = self.enumerate_vertices_of_constraint_polygon(self.theta_range,self.B_external_stats_intermediate,closed=True,A=self.A_external_stats_intermediate)
 
         if len(self.exterior_polygon_vertex_x_list)>=3:
             #repeat the first two vertices purpose of making sure the star catches all edges